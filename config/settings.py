@@ -25,6 +25,16 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma2:2b")
 
 # Embedding model (upgraded to all-mpnet-base-v2 for better retrieval quality)
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-mpnet-base-v2")
+# CPU threads for embedding inference (0 = torch default)
+EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))
+# Inference backend for the embedding model: torch, onnx or openvino
+# (onnx/openvino require sentence-transformers>=3.2 with the matching extra)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Optimized/quantized model file for the onnx/openvino backends, relative to the
+# model repo (e.g. onnx/model_O3.onnx or onnx/model_qint8_avx512_vnni.onnx; empty = default)
+EMBEDDING_MODEL_FILE = os.getenv("EMBEDDING_MODEL_FILE", "")
+# Texts per embedding model forward pass (larger batches amortize per-call overhead)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
 
 # Processing settings
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
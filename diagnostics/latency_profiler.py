@@ -44,19 +44,19 @@ class LatencyProfiler:
             profile['timings']['total_ms'] = (time.time() - start_total) * 1000
             return profile
         
-        # 2. Query embedding generation
+        # 2. Query embedding generation (goes through the query embedding LRU)
         start = time.time()
-        query_embedding = self.pipeline.db_manager.generate_embeddings([query])
+        query_embedding = self.pipeline.db_manager.embed_query(query)
         profile['timings']['query_embedding_ms'] = (time.time() - start) * 1000
         
         # 3. Vector search (tickets)
         start = time.time()
-        ticket_results = self.pipeline.db_manager.search_tickets(query, n_tickets)
+        ticket_results = self.pipeline.db_manager.search_tickets(query, n_tickets, query_embedding=query_embedding)
         profile['timings']['search_tickets_ms'] = (time.time() - start) * 1000
         
         # 4. Vector search (guides)
         start = time.time()
-        guide_results = self.pipeline.db_manager.search_guides(query, n_guides)
+        guide_results = self.pipeline.db_manager.search_guides(query, n_guides, query_embedding=query_embedding)
         profile['timings']['search_guides_ms'] = (time.time() - start) * 1000
         
         # 5. Context formatting
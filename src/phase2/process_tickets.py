@@ -7,6 +7,7 @@ import pandas as pd
 from bs4 import BeautifulSoup
 
 from config.settings import ZENDESK_EXPORT_FILE, PROCESSED_DATA_DIR
+from src.utils.json_utils import load_json
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -27,8 +28,7 @@ class TicketProcessor:
         if not self.input_file.exists():
             raise FileNotFoundError(f"Zendesk export file not found: {self.input_file}")
         
-        with open(self.input_file, 'r', encoding='utf-8') as f:
-            self.tickets = json.load(f)
+        self.tickets = load_json(self.input_file)
         
         logger.info(f"Loaded {len(self.tickets)} tickets")
         return self.tickets
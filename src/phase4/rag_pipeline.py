@@ -1,16 +1,26 @@
 """RAG Pipeline Orchestrator - Combines retrieval with LLM generation."""
 import json
 import hashlib
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from datetime import datetime, timedelta
+import numpy as np
 # Removed ThreadPoolExecutor - using sequential generation for better GPU efficiency
-import ollama
 from src.phase4.vector_db import VectorDBManager
 from src.utils.logger import setup_logger
+from src.utils.ollama_client import get_ollama_client
 from config.settings import OLLAMA_MODEL, OLLAMA_BASE_URL
 
 logger = setup_logger(__name__)
 
+# Prefix of the text returned in place of a response when generation fails
+_GENERATION_ERROR = "Error: Unable to generate response."
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Truncate text to max_chars, marking cut text with an ellipsis."""
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
 
 class RAGPipeline:
     """RAG Pipeline for intelligent customer support responses."""
@@ -28,10 +38,24 @@ class RAGPipeline:
         self.model = model or OLLAMA_MODEL
         self.base_url = base_url or OLLAMA_BASE_URL
         
+        # Shared Ollama client: keeps the HTTP connection pool alive
+        # across requests and honours the configured base URL
+        self.client = get_ollama_client(self.base_url)
+        
+        # Response caches are shared by every Streamlit session using this pipeline
+        self._cache_lock = threading.RLock()
+        
         # Response cache (simple in-memory cache)
         self._cache = {}
         self._cache_ttl = timedelta(hours=24)  # Cache for 24 hours
         
+        # Semantic cache: near-duplicate queries (cosine similarity >= threshold)
+        # reuse a previous answer without retrieval or generation
+        self._semantic_cache: List[Dict[str, Any]] = []
+        self._semantic_vectors: Optional[np.ndarray] = None  # One unit vector per entry
+        self._semantic_cache_size = 256
+        self._semantic_threshold = 0.95
+        
         logger.info(f"RAG Pipeline initialized with model: {self.model}")
         
         # Initialize collections if not already done
@@ -45,38 +69,144 @@ class RAGPipeline:
     
     def _get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """Get cached response if available and not expired."""
-        if cache_key in self._cache:
-            cached_data = self._cache[cache_key]
-            if datetime.now() - cached_data['timestamp'] < self._cache_ttl:
-                logger.info("Cache hit - returning cached response")
-                return cached_data['response']
-            else:
-                # Expired, remove from cache
-                del self._cache[cache_key]
+        with self._cache_lock:
+            if cache_key in self._cache:
+                cached_data = self._cache[cache_key]
+                if datetime.now() - cached_data['timestamp'] < self._cache_ttl:
+                    logger.info("Cache hit - returning cached response")
+                    return cached_data['response']
+                else:
+                    # Expired, remove from cache
+                    del self._cache[cache_key]
         return None
     
     def _cache_response(self, cache_key: str, response: Dict[str, Any]):
         """Cache a response."""
-        self._cache[cache_key] = {
-            'response': response,
-            'timestamp': datetime.now()
-        }
-        logger.info(f"Response cached (cache size: {len(self._cache)})")
+        with self._cache_lock:
+            self._cache[cache_key] = {
+                'response': response,
+                'timestamp': datetime.now()
+            }
+            logger.info(f"Response cached (cache size: {len(self._cache)})")
+    
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a query as a unit vector (for semantic cache lookups)."""
+        # Embeddings are already L2-normalized (and cached per query by the manager)
+        return np.asarray(self.db_manager.embed_query(query), dtype=np.float32)
+    
+    def _get_semantic_cached_response(self, query_vector: np.ndarray,
+                                      n_tickets: int, n_guides: int) -> Optional[Dict[str, Any]]:
+        """Get a cached response for a semantically equivalent query, if any."""
+        # Entries and vectors are only read together under the lock, so a row
+        # index always refers to the entry it was computed for
+        with self._cache_lock:
+            if not self._semantic_cache:
+                return None
+            
+            similarities = self._semantic_vectors @ query_vector
+            now = datetime.now()
+            for idx in np.argsort(-similarities):
+                if similarities[idx] < self._semantic_threshold:
+                    break
+                entry = self._semantic_cache[idx]
+                if (entry['n_tickets'] == n_tickets and entry['n_guides'] == n_guides
+                        and now - entry['timestamp'] < self._cache_ttl):
+                    logger.info(f"Semantic cache hit (similarity={similarities[idx]:.3f})")
+                    # Mark as most recently used: move the entry and its vector row to the end
+                    self._semantic_cache.append(self._semantic_cache.pop(idx))
+                    order = np.append(np.delete(np.arange(len(self._semantic_cache)), idx), idx)
+                    self._semantic_vectors = self._semantic_vectors[order]
+                    return entry['response']
+        return None
+    
+    def _cache_semantic_response(self, query_vector: np.ndarray, n_tickets: int,
+                                 n_guides: int, response: Dict[str, Any]):
+        """Cache a response under its query embedding.
+        
+        When full, expired entries are dropped first, then the least recently used one.
+        """
+        row = query_vector[np.newaxis, :]
+        with self._cache_lock:
+            if len(self._semantic_cache) >= self._semantic_cache_size:
+                now = datetime.now()
+                live = [i for i, entry in enumerate(self._semantic_cache)
+                        if now - entry['timestamp'] < self._cache_ttl]
+                self._semantic_cache = [self._semantic_cache[i] for i in live]
+                self._semantic_vectors = self._semantic_vectors[live] if live else None
+            if len(self._semantic_cache) >= self._semantic_cache_size:
+                self._semantic_cache.pop(0)  # Least recently used (hits move entries to the end)
+                self._semantic_vectors = self._semantic_vectors[1:]
+            
+            self._semantic_cache.append({
+                'n_tickets': n_tickets,
+                'n_guides': n_guides,
+                'response': response,
+                'timestamp': datetime.now()
+            })
+            self._semantic_vectors = row if self._semantic_vectors is None else np.vstack([self._semantic_vectors, row])
+    
+    def _lookup_cache(self, user_query: str, n_tickets: int,
+                      n_guides: int) -> Tuple[str, np.ndarray, Optional[Dict[str, Any]]]:
+        """Look a query up in the exact cache, then the semantic cache.
+        
+        Returns:
+            (cache key, query embedding, cached result or None); the key and
+            embedding are reused to store the result on a miss
+        """
+        cache_key = self._get_cache_key(user_query, n_tickets, n_guides)
+        cached = self._get_cached_response(cache_key)
+        if cached:
+            return cache_key, None, cached
+        
+        # Fall back to a semantically equivalent earlier query
+        query_vector = self._embed_query(user_query)
+        return cache_key, query_vector, self._get_semantic_cached_response(query_vector, n_tickets, n_guides)
+    
+    def _store_in_cache(self, cache_key: str, query_vector: np.ndarray, n_tickets: int,
+                        n_guides: int, result: Dict[str, Any]):
+        """Cache a single-draft result in both caches, unless generation failed."""
+        if result['response'].startswith(_GENERATION_ERROR):
+            return
+        self._cache_response(cache_key, result)
+        self._cache_semantic_response(query_vector, n_tickets, n_guides, result)
+    
+    def cache_size(self) -> int:
+        """Number of distinct cached responses (a response can sit in both caches)."""
+        with self._cache_lock:
+            responses = {id(entry['response']) for entry in self._cache.values()}
+            responses.update(id(entry['response']) for entry in self._semantic_cache)
+        return len(responses)
     
-    def retrieve_context(self, query: str, n_tickets: int = 3, n_guides: int = 3) -> Dict[str, Any]:
+    def clear_cache(self) -> int:
+        """Clear exact and semantic response caches.
+        
+        Returns:
+            Number of cached responses removed
+        """
+        with self._cache_lock:
+            removed = self.cache_size()
+            self._cache.clear()
+            self._semantic_cache.clear()
+            self._semantic_vectors = None
+        return removed
+    
+    def retrieve_context(self, query: str, n_tickets: int = 3, n_guides: int = 3,
+                         query_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """Retrieve relevant context from vector database.
         
         Args:
             query: User query
             n_tickets: Number of relevant tickets to retrieve
             n_guides: Number of relevant guide sections to retrieve
+            query_embedding: Precomputed query embedding (skips re-embedding)
             
         Returns:
             Retrieved context with tickets and guides
         """
         logger.info(f"Retrieving context for query: {query[:100]}...")
         
-        results = self.db_manager.search_all(query, n_tickets=n_tickets, n_guides=n_guides)
+        results = self.db_manager.search_all(query, n_tickets=n_tickets, n_guides=n_guides,
+                                             query_embedding=query_embedding)
         
         return results
     
@@ -101,7 +231,7 @@ class RAGPipeline:
                 context_parts.append(f"\n[TICKET {i}]")
                 context_parts.append(f"Subject: {metadata.get('subject', 'N/A')}")
                 context_parts.append(f"Status: {metadata.get('status', 'N/A')}")
-                context_parts.append(f"Content: {doc[:500]}...")  # Limit length
+                context_parts.append(f"Content: {_truncate(doc, 500)}")  # Limit length
                 context_parts.append("")
         
         # Add relevant guides
@@ -114,7 +244,7 @@ class RAGPipeline:
                 context_parts.append(f"\n[GUIDE {i}]")
                 context_parts.append(f"Guide: {metadata.get('guide_title', 'N/A')}")
                 context_parts.append(f"Section: {metadata.get('section_title', 'N/A')}")
-                context_parts.append(f"Content: {doc[:700]}...")  # More context for guides
+                context_parts.append(f"Content: {_truncate(doc, 700)}")  # More context for guides
                 context_parts.append("")
         
         return "\n".join(context_parts)
@@ -162,6 +292,18 @@ Infine, asciuga l'auto con un panno in microfibra assorbente per evitare aloni.
         
         return prompt
     
+    def _generation_options(self, temperature: float) -> Dict[str, Any]:
+        """Ollama sampling options shared by blocking and streaming generation."""
+        return {
+            'temperature': temperature,   # Configurable creativity
+            'top_p': 0.9,                 # Nucleus sampling
+            'top_k': 40,                  # Reduced for faster sampling (was 50)
+            'num_predict': 250,           # Optimized based on diagnostics (was 500)
+            'repeat_penalty': 1.1,        # Avoid repetition
+            'num_ctx': 1024,              # Optimized context window (was 1536)
+            'num_thread': 4,              # Use more CPU threads if GPU is busy
+        }
+    
     def generate_response(self, prompt: str, stream: bool = False, temperature: float = 0.7) -> str:
         """Generate response using Ollama LLM with optimized parameters.
         
@@ -173,37 +315,105 @@ Infine, asciuga l'auto con un panno in microfibra assorbente per evitare aloni.
         Returns:
             Generated response text
         """
+        if stream:
+            # Collect the streamed chunks (single join instead of repeated +=)
+            return "".join(self.stream_response(prompt, temperature=temperature))
+        
         logger.info(f"Generating response with {self.model} (temp={temperature})")
         
         try:
-            response = ollama.generate(
+            response = self.client.generate(
                 model=self.model,
                 prompt=prompt,
-                stream=stream,
-                options={
-                    'temperature': temperature,   # Configurable creativity
-                    'top_p': 0.9,                 # Nucleus sampling
-                    'top_k': 40,                  # Reduced for faster sampling (was 50)
-                    'num_predict': 250,           # Optimized based on diagnostics (was 500)
-                    'repeat_penalty': 1.1,        # Avoid repetition
-                    'num_ctx': 1024,              # Optimized context window (was 1536)
-                    'num_thread': 4,              # Use more CPU threads if GPU is busy
-                }
+                options=self._generation_options(temperature)
             )
-            
-            if stream:
-                # Handle streaming response
-                full_response = ""
-                for chunk in response:
-                    if 'response' in chunk:
-                        full_response += chunk['response']
-                return full_response
-            else:
-                return response['response']
+            return response['response']
                 
         except Exception as e:
             logger.error(f"Error generating response: {e}")
-            return f"Error: Unable to generate response. {str(e)}"
+            return f"{_GENERATION_ERROR} {str(e)}"
+    
+    def stream_response(self, prompt: str, temperature: float = 0.7) -> Iterator[str]:
+        """Stream the response text chunk by chunk as Ollama generates it.
+        
+        Args:
+            prompt: Complete prompt with context
+            temperature: Creativity level (0.0-1.0). Higher = more creative/varied
+            
+        Yields:
+            Response text chunks (first tokens arrive without waiting for the full completion)
+        """
+        logger.info(f"Streaming response with {self.model} (temp={temperature})")
+        
+        try:
+            for chunk in self.client.generate(
+                model=self.model,
+                prompt=prompt,
+                stream=True,
+                options=self._generation_options(temperature)
+            ):
+                text = chunk.get('response')
+                if text:
+                    yield text
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            yield f"{_GENERATION_ERROR} {str(e)}"
+    
+    def query_stream(self, user_query: str, n_tickets: int = 3, n_guides: int = 3,
+                     temperature: float = 0.7, use_cache: bool = True) -> Dict[str, Any]:
+        """Retrieve context and stream a single response.
+        
+        Shares the response caches with query(): a cache hit is returned as a
+        one-chunk stream, and a fully streamed response is cached once consumed.
+        
+        Args:
+            user_query: Customer query
+            n_tickets: Number of relevant tickets to retrieve
+            n_guides: Number of relevant guide sections to retrieve
+            temperature: Creativity level (0.0-1.0)
+            use_cache: Whether to use cached responses
+            
+        Returns:
+            Dictionary with query, context, 'response_stream' (iterator of text
+            chunks) and 'cached'; 'response' holds the full text once the stream
+            has been consumed
+        """
+        logger.info(f"Processing streaming query: {user_query}")
+        
+        query_vector = None
+        if use_cache:
+            cache_key, query_vector, cached = self._lookup_cache(user_query, n_tickets, n_guides)
+            if cached:
+                return {**cached, 'response_stream': iter([cached['response']]), 'cached': True}
+        
+        results = self.retrieve_context(user_query, n_tickets, n_guides, query_embedding=query_vector)
+        prompt = self.create_prompt(user_query, self.format_context(results))
+        
+        result = {
+            'query': user_query,
+            'context': {
+                'tickets': results['tickets'],
+                'guides': results['guides']
+            },
+            'response': '',
+            'model': self.model,
+            'num_drafts': 1
+        }
+        
+        def response_stream() -> Iterator[str]:
+            chunks = []
+            for chunk in self.stream_response(prompt, temperature=temperature):
+                chunks.append(chunk)
+                yield chunk
+            result['response'] = "".join(chunks)
+            # A mid-stream failure ends with the error chunk; don't cache partial answers
+            if use_cache and chunks and not chunks[-1].startswith(_GENERATION_ERROR):
+                cached_result = {k: v for k, v in result.items() if k not in ('response_stream', 'cached')}
+                self._store_in_cache(cache_key, query_vector, n_tickets, n_guides, cached_result)
+        
+        result['response_stream'] = response_stream()
+        result['cached'] = False
+        return result
     
     def query(self, user_query: str, n_tickets: int = 3, n_guides: int = 3, 
               stream: bool = False, use_cache: bool = True, num_drafts: int = 1) -> Dict[str, Any]:
@@ -224,15 +434,19 @@ Infine, asciuga l'auto con un panno in microfibra assorbente per evitare aloni.
         logger.info(f"Processing query: {user_query}")
         logger.info("="*80)
         
-        # Check cache first (only for non-streaming queries)
-        if use_cache and not stream:
-            cache_key = self._get_cache_key(user_query, n_tickets, n_guides)
-            cached = self._get_cached_response(cache_key)
+        # Only single-draft, non-streaming results are cached, so only those can be served
+        # from the cache (a 3-draft request must not get a cached 1-draft result)
+        use_response_cache = use_cache and not stream and num_drafts == 1
+        
+        # Check cache first
+        query_vector = None
+        if use_response_cache:
+            cache_key, query_vector, cached = self._lookup_cache(user_query, n_tickets, n_guides)
             if cached:
                 return cached
         
-        # Step 1: Retrieve relevant context
-        results = self.retrieve_context(user_query, n_tickets, n_guides)
+        # Step 1: Retrieve relevant context (reusing the cache-probe embedding if any)
+        results = self.retrieve_context(user_query, n_tickets, n_guides, query_embedding=query_vector)
         
         # Step 2: Format context
         formatted_context = self.format_context(results)
@@ -309,9 +523,9 @@ Infine, asciuga l'auto con un panno in microfibra assorbente per evitare aloni.
                 'num_drafts': num_drafts
             }
         
-        # Cache the result (only for non-streaming queries and single drafts)
-        if use_cache and not stream and num_drafts == 1:
-            self._cache_response(cache_key, result)
+        # Cache the result (only for non-streaming queries and single drafts, never errors)
+        if use_response_cache:
+            self._store_in_cache(cache_key, query_vector, n_tickets, n_guides, result)
         
         return result
     
@@ -322,7 +536,7 @@ Infine, asciuga l'auto con un panno in microfibra assorbente per evitare aloni.
             Status dictionary
         """
         try:
-            result = ollama.list()
+            result = self.client.list()
             
             # Handle both old and new API format
             if isinstance(result, dict) and 'models' in result:
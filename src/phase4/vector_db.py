@@ -1,15 +1,71 @@
 """Vector Database Manager using ChromaDB."""
-import json
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+import numpy as np
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+from src.utils.json_utils import iter_json_array
 from src.utils.logger import setup_logger
-from config.settings import DATA_DIR, PROCESSED_DATA_DIR, GUIDES_DATA_DIR, EMBEDDING_MODEL, CHROMA_DATA_DIR
+from config.settings import DATA_DIR, PROCESSED_DATA_DIR, GUIDES_DATA_DIR, EMBEDDING_MODEL, CHROMA_DATA_DIR, EMBEDDING_NUM_THREADS, EMBEDDING_BACKEND, EMBEDDING_BATCH_SIZE, EMBEDDING_MODEL_FILE
 
 logger = setup_logger(__name__)
 
+# Metadata values dropped before storing (ChromaDB doesn't accept None values)
+_EMPTY_METADATA_VALUES = frozenset({'', 'None', None})
+
+# Embeddings remembered per ingestion run so repeated documents are embedded once
+# (bounded: ~30 MB at 768 dimensions)
+_INGEST_EMBEDDING_CACHE_SIZE = 10_000
+
+
+@lru_cache(maxsize=None)
+def _load_embedding_model(model_name: str):
+    """Load a sentence transformer model, shared by all managers in the process.
+    
+    The import is deferred so that importing this module does not pull in
+    torch/transformers until an embedding model is actually needed.
+    """
+    # Let the Rust (fast) tokenizer use all cores for batch tokenization
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if EMBEDDING_NUM_THREADS > 0:
+        torch.set_num_threads(EMBEDDING_NUM_THREADS)
+    if EMBEDDING_BACKEND != "torch":
+        # Same model weights served through ONNX Runtime / OpenVINO, so stored
+        # vectors stay compatible with the torch backend
+        logger.info(f"Loading embedding model: {model_name} (backend: {EMBEDDING_BACKEND})")
+        # Optionally pick a graph-optimized or int8-quantized export from the model repo
+        model_kwargs = {"file_name": EMBEDDING_MODEL_FILE} if EMBEDDING_MODEL_FILE else None
+        return SentenceTransformer(model_name, backend=EMBEDDING_BACKEND, model_kwargs=model_kwargs)
+    
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Loading embedding model: {model_name} (device: {device})")
+    model = SentenceTransformer(model_name, device=device)
+    if device == "cuda":
+        # FP16 weights halve memory traffic and run matmuls on tensor cores
+        model.half()
+        try:
+            model.encode(["warm-up"], show_progress_bar=False)  # Also warms up the CUDA kernels
+        except RuntimeError as e:
+            logger.warning(f"FP16 inference not supported on this GPU, using FP32: {e}")
+            model.float()
+    return model
+
+
+def _clean(value: Any, max_length: int = 500) -> str:
+    """Convert a metadata value to a string of at most max_length characters."""
+    if isinstance(value, str) and len(value) <= max_length:
+        return value  # Common case: already a short string, no copy needed
+    return str(value)[:max_length]
+
 
 class VectorDBManager:
     """Manages vector database operations for RAG system."""
@@ -22,8 +78,7 @@ class VectorDBManager:
             embedding_model: Sentence transformer model name (default: from settings)
         """
         # Use embedding model from settings if not provided
-        if embedding_model is None:
-            embedding_model = EMBEDDING_MODEL
+        self.embedding_model_name = embedding_model or EMBEDDING_MODEL
         self.db_path = db_path or CHROMA_DATA_DIR
         self.db_path.mkdir(parents=True, exist_ok=True)
         
@@ -38,16 +93,40 @@ class VectorDBManager:
             )
         )
         
-        # Initialize embedding model
-        logger.info(f"Loading embedding model: {embedding_model}")
-        self.embedding_model = SentenceTransformer(embedding_model)
-        self.embedding_dim = self.embedding_model.get_sentence_embedding_dimension()
-        logger.info(f"Embedding dimension: {self.embedding_dim}")
-        
         # Initialize collections
         self.tickets_collection = None
         self.guides_collection = None
         
+        # LRU cache of query embeddings (repeated queries skip the model forward pass)
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_size = 1024
+        self._query_cache_lock = threading.Lock()  # Manager is shared across Streamlit sessions
+        
+        # Worker threads shared by concurrent searches and overlapped ingestion writes
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vdb")
+    
+    def close(self):
+        """Shut down the background worker threads."""
+        self._executor.shutdown(wait=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @cached_property
+    def embedding_model(self):
+        """Sentence transformer model, loaded on first use (stats-only callers never pay for it)."""
+        model = _load_embedding_model(self.embedding_model_name)
+        logger.info(f"Embedding dimension: {model.get_sentence_embedding_dimension()}")
+        return model
+    
+    @property
+    def embedding_dim(self) -> int:
+        """Dimension of the embedding vectors."""
+        return self.embedding_model.get_sentence_embedding_dimension()
+        
     def create_collections(self, reset: bool = False):
         """Create or get collections for tickets and guides.
         
@@ -57,72 +136,157 @@ class VectorDBManager:
         if reset:
             logger.warning("Resetting collections - all existing data will be deleted")
             try:
-                self.client.delete_collection("tickets")
-                self.client.delete_collection("guides")
+                # Drops everything in one call (needs allow_reset=True, set above)
+                self.client.reset()
                 logger.info("Deleted existing collections")
             except Exception as e:
-                logger.debug(f"No existing collections to delete: {e}")
-        
-        # Create tickets collection
+                logger.debug(f"Client reset unavailable, deleting collections one by one: {e}")
+                for name in ("tickets", "guides"):
+                    try:
+                        self.client.delete_collection(name)
+                    except Exception as e:
+                        logger.debug(f"No existing '{name}' collection to delete: {e}")
+        
+        # HNSW graph parameters only take effect when a collection is first created
+        # (or recreated with reset=True). They are set explicitly because the
+        # defaults vary across the versions requirements.txt allows (chromadb>=0.4.0):
+        # older releases default search_ef to 10, chromadb 1.x to 100.
+        # Create tickets collection (larger corpus: denser graph, wider search beam)
         self.tickets_collection = self.client.get_or_create_collection(
             name="tickets",
             metadata={
                 "description": "Historical Zendesk support tickets",
-                "hnsw:space": "cosine"
+                "hnsw:space": "cosine",
+                "hnsw:M": 48,
+                "hnsw:construction_ef": 200,
+                "hnsw:search_ef": 128
             }
         )
         logger.info(f"Tickets collection ready: {self.tickets_collection.count()} documents")
         
-        # Create guides collection
+        # Create guides collection (a few thousand sections: default graph density
+        # is enough; search_ef stays at the chromadb 1.x default of 100 so recall
+        # never drops below it)
         self.guides_collection = self.client.get_or_create_collection(
             name="guides",
             metadata={
                 "description": "LaCuraDellAuto technical guides",
-                "hnsw:space": "cosine"
+                "hnsw:space": "cosine",
+                "hnsw:M": 16,
+                "hnsw:construction_ef": 100,
+                "hnsw:search_ef": 100
             }
         )
         logger.info(f"Guides collection ready: {self.guides_collection.count()} documents")
         
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def generate_embeddings(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
         """Generate embeddings for a list of texts.
         
+        sentence-transformers sorts inputs by length before batching and restores
+        the original order afterwards, so each mini-batch only pads to its own
+        longest text. Duplicate texts (e.g. templated replies) are embedded once, and
+        texts are pre-truncated to roughly the model's token limit.
+        
         Args:
             texts: List of text strings to embed
+            batch_size: Number of texts per model forward pass
             
         Returns:
-            List of embedding vectors
+            float32 array of L2-normalized embedding vectors, one row per text
         """
-        logger.debug(f"Generating embeddings for {len(texts)} texts")
-        embeddings = self.embedding_model.encode(texts, show_progress_bar=False)
-        # Handle both numpy arrays and lists
-        if hasattr(embeddings, 'tolist'):
-            return embeddings.tolist()
+        # The model truncates at max_seq_length tokens anyway; cutting the text first
+        # (generously, ~8 chars/token) saves tokenizing content it would never see
+        max_chars = 8 * self.embedding_model.max_seq_length
+        texts = [text[:max_chars] for text in texts]
+        unique_texts = list(dict.fromkeys(texts))
+        logger.debug("Generating embeddings for %d texts (%d unique)", len(texts), len(unique_texts))
+        embeddings = self.embedding_model.encode(
+            unique_texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,  # Unit vectors: cosine similarity == dot product
+            show_progress_bar=False
+        )
+        # ChromaDB accepts arrays directly; avoid boxing every float into a Python list
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(unique_texts) < len(texts):
+            # Scatter the unique embeddings back to the original positions
+            row_of = {text: row for row, text in enumerate(unique_texts)}
+            embeddings = embeddings[[row_of[text] for text in texts]]
         return embeddings
     
-    def add_tickets(self, tickets_file: Optional[Path] = None, batch_size: int = 50):
-        """Load and add tickets to vector database.
+    def _embed_documents_cached(self, documents: List[str], cache: Dict[bytes, np.ndarray]) -> np.ndarray:
+        """Embed documents, reusing embeddings of documents seen earlier in this ingestion.
         
         Args:
-            tickets_file: Path to processed tickets JSON
-            batch_size: Number of tickets to process at once
+            documents: Documents to embed
+            cache: Content digest -> embedding, shared across the batches of one ingestion
+            
+        Returns:
+            float32 array of embeddings, one row per document
         """
-        tickets_file = tickets_file or PROCESSED_DATA_DIR / "processed_tickets.json"
-        
-        if not tickets_file.exists():
-            logger.error(f"Tickets file not found: {tickets_file}")
-            raise FileNotFoundError(f"Tickets file not found: {tickets_file}")
-        
-        logger.info(f"Loading tickets from: {tickets_file}")
-        with open(tickets_file, 'r', encoding='utf-8') as f:
-            tickets = json.load(f)
-        
-        logger.info(f"Processing {len(tickets)} tickets")
+        # Key on a 16-byte digest so the cache doesn't keep whole documents alive
+        keys = [hashlib.blake2b(doc.encode('utf-8'), digest_size=16).digest() for doc in documents]
+        missing = [i for i, key in enumerate(keys) if key not in cache]
+        fresh = {}
+        if missing:
+            new_embeddings = self.generate_embeddings([documents[i] for i in missing])
+            fresh = {keys[i]: row for i, row in zip(missing, new_embeddings)}
+        embeddings = np.stack([fresh[key] if key in fresh else cache[key] for key in keys])
+        for key, row in fresh.items():
+            if len(cache) >= _INGEST_EMBEDDING_CACHE_SIZE:
+                break
+            cache[key] = row.copy()  # Don't pin the whole batch array
+        return embeddings
+    
+    def _add_in_batches(self, collection, records: Iterable[Tuple[str, str, Dict[str, Any]]],
+                        batch_size: int) -> int:
+        """Embed and add (id, document, metadata) records to a collection in chunks.
         
-        # Prepare data for ChromaDB
-        ids = []
-        documents = []
-        metadatas = []
+        Each chunk is written to ChromaDB on a background thread while the next
+        chunk is embedded, so at most two chunks are held in memory at a time.
+        Documents repeated across chunks (e.g. templated replies) are embedded once.
+        Records are upserted, so re-running ingestion refreshes existing IDs in a
+        single call instead of skipping them as duplicates.
         
+        Args:
+            collection: ChromaDB collection to add to
+            records: Iterable of (id, document, metadata) tuples
+            batch_size: Number of records to embed and add per chunk
+            
+        Returns:
+            Number of records added
+        """
+        def write(ids, documents, embeddings, metadatas, total):
+            collection.upsert(
+                ids=ids,
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=metadatas
+            )
+            logger.info(f"Added {total} documents to '{collection.name}'")
+        
+        records = iter(records)
+        total = 0
+        pending = None
+        embedding_cache: Dict[bytes, np.ndarray] = {}
+        # Only one write is in flight at a time, which keeps upserts in order;
+        # encode and Chroma both release the GIL so the two overlap
+        while True:
+            chunk = list(islice(records, batch_size))
+            if not chunk:
+                break
+            ids, documents, metadatas = (list(column) for column in zip(*chunk))
+            embeddings = self._embed_documents_cached(documents, embedding_cache)
+            if pending is not None:
+                pending.result()  # Wait for the previous write (and surface its errors)
+            total += len(ids)
+            pending = self._executor.submit(write, ids, documents, embeddings, metadatas, total)
+        if pending is not None:
+            pending.result()
+        return total
+    
+    def _iter_ticket_records(self, tickets: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yield (id, document, metadata) records for tickets with searchable text."""
         for ticket in tickets:
             ticket_id = f"ticket_{ticket['ticket_id']}"
             
@@ -135,7 +299,7 @@ class VectorDBManager:
             # Metadata (ChromaDB doesn't accept None values)
             metadata = {
                 'ticket_id': str(ticket['ticket_id']),
-                'subject': str(ticket.get('subject', ''))[:500],  # Limit length
+                'subject': _clean(ticket.get('subject', '')),  # Limit length
                 'status': str(ticket.get('status', '')),
                 'priority': str(ticket.get('priority', '')),
                 'created_at': str(ticket.get('created_at', '')),
@@ -145,50 +309,12 @@ class VectorDBManager:
             }
             
             # Remove empty string values to save space
-            metadata = {k: v for k, v in metadata.items() if v not in ['', 'None', None]}
+            metadata = {k: v for k, v in metadata.items() if v not in _EMPTY_METADATA_VALUES}
             
-            ids.append(ticket_id)
-            documents.append(document)
-            metadatas.append(metadata)
-        
-        # Generate embeddings and add to collection
-        logger.info(f"Generating embeddings for {len(documents)} tickets")
-        embeddings = self.generate_embeddings(documents)
-        
-        logger.info(f"Adding {len(documents)} tickets to vector database")
-        self.tickets_collection.add(
-            ids=ids,
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas
-        )
-        
-        logger.info(f"Successfully added {len(documents)} tickets to vector database")
-        
-    def add_guides(self, guides_file: Optional[Path] = None, batch_size: int = 50):
-        """Load and add guide sections to vector database.
-        
-        Args:
-            guides_file: Path to guides JSON
-            batch_size: Number of sections to process at once
-        """
-        guides_file = guides_file or GUIDES_DATA_DIR / "guides.json"
-        
-        if not guides_file.exists():
-            logger.error(f"Guides file not found: {guides_file}")
-            raise FileNotFoundError(f"Guides file not found: {guides_file}")
-        
-        logger.info(f"Loading guides from: {guides_file}")
-        with open(guides_file, 'r', encoding='utf-8') as f:
-            guides = json.load(f)
-        
-        logger.info(f"Processing {len(guides)} guides")
-        
-        # Prepare data for ChromaDB (each section is a separate document)
-        ids = []
-        documents = []
-        metadatas = []
-        
+            yield ticket_id, document, metadata
+    
+    def _iter_guide_records(self, guides: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yield (id, document, metadata) records for guide sections (one per section)."""
         for guide in guides:
             guide_number = guide.get('guide_number', 'UNKNOWN')
             guide_title = guide.get('title', '').strip()
@@ -199,7 +325,7 @@ class VectorDBManager:
                 section_content = section.get('content', '')
                 
                 if not section_content or len(section_content) < 50:
-                    logger.debug(f"Skipping section with insufficient content: {section_title}")
+                    logger.debug("Skipping section with insufficient content: %s", section_title)
                     continue
                 
                 # Create document combining section title and content
@@ -211,8 +337,8 @@ class VectorDBManager:
                 # Metadata (ChromaDB doesn't accept None values)
                 metadata = {
                     'guide_number': str(guide_number),
-                    'guide_title': str(guide_title)[:500],
-                    'section_title': str(section_title)[:500],
+                    'guide_title': _clean(guide_title),
+                    'section_title': _clean(section_title),
                     'section_index': int(idx),
                     'url': str(guide_url),
                     'anchor_id': str(section.get('anchor_id', '')),
@@ -221,85 +347,156 @@ class VectorDBManager:
                 }
                 
                 # Remove empty string values to save space
-                metadata = {k: v for k, v in metadata.items() if v not in ['', 'None', None]}
+                metadata = {k: v for k, v in metadata.items() if v not in _EMPTY_METADATA_VALUES}
                 
-                ids.append(section_id)
-                documents.append(document)
-                metadatas.append(metadata)
-        
-        # Generate embeddings and add to collection
-        logger.info(f"Generating embeddings for {len(documents)} guide sections")
-        embeddings = self.generate_embeddings(documents)
-        
-        logger.info(f"Adding {len(documents)} guide sections to vector database")
-        self.guides_collection.add(
-            ids=ids,
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas
-        )
+                yield section_id, document, metadata
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query, reusing the cached embedding for repeated queries.
         
-        logger.info(f"Successfully added {len(documents)} guide sections to vector database")
+        Args:
+            query: Search query
+            
+        Returns:
+            Query embedding vector
+        """
+        key = " ".join(query.split())
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
+                return embedding
+        
+        # Embed outside the lock so concurrent cache hits aren't blocked by the model
+        embedding = self.generate_embeddings([key])[0]
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            if len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
     
-    def search_tickets(self, query: str, n_results: int = 5) -> Dict[str, Any]:
+    def add_tickets(self, tickets_file: Optional[Path] = None, batch_size: int = 250):
+        """Load and add tickets to vector database.
+        
+        Args:
+            tickets_file: Path to processed tickets JSON
+            batch_size: Number of tickets to embed and add per ChromaDB call
+        """
+        tickets_file = tickets_file or PROCESSED_DATA_DIR / "processed_tickets.json"
+        
+        if not tickets_file.exists():
+            logger.error(f"Tickets file not found: {tickets_file}")
+            raise FileNotFoundError(f"Tickets file not found: {tickets_file}")
+        
+        logger.info(f"Loading tickets from: {tickets_file}")
+        tickets = iter_json_array(tickets_file)
+        
+        logger.info(f"Processing tickets in batches of {batch_size}")
+        
+        added = self._add_in_batches(self.tickets_collection, self._iter_ticket_records(tickets), batch_size)
+        
+        logger.info(f"Successfully added {added} tickets to vector database")
+        
+    def add_guides(self, guides_file: Optional[Path] = None, batch_size: int = 250):
+        """Load and add guide sections to vector database.
+        
+        Args:
+            guides_file: Path to guides JSON
+            batch_size: Number of sections to embed and add per ChromaDB call
+        """
+        guides_file = guides_file or GUIDES_DATA_DIR / "guides.json"
+        
+        if not guides_file.exists():
+            logger.error(f"Guides file not found: {guides_file}")
+            raise FileNotFoundError(f"Guides file not found: {guides_file}")
+        
+        logger.info(f"Loading guides from: {guides_file}")
+        guides = iter_json_array(guides_file)
+        
+        logger.info(f"Processing guides in batches of {batch_size}")
+        
+        added = self._add_in_batches(self.guides_collection, self._iter_guide_records(guides), batch_size)
+        
+        logger.info(f"Successfully added {added} guide sections to vector database")
+    
+    def search_tickets(self, query: str, n_results: int = 5,
+                       query_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """Search for relevant tickets.
         
         Args:
             query: Search query
             n_results: Number of results to return
+            query_embedding: Precomputed embedding of the query (skips re-embedding)
             
         Returns:
             Search results with documents, metadata, and distances
         """
-        logger.debug(f"Searching tickets for: {query[:100]}...")
+        logger.debug("Searching tickets for: %.100s...", query)
         
-        query_embedding = self.generate_embeddings([query])[0]
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
         
         results = self.tickets_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
+            # One (1, dim) array: chromadb 0.4.x rejects a list holding a 1-D array
+            query_embeddings=np.asarray(query_embedding, dtype=np.float32).reshape(1, -1),
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]  # Never ship embeddings back
         )
         
-        logger.debug(f"Found {len(results['ids'][0]) if results['ids'] else 0} ticket results")
+        logger.debug("Found %d ticket results", len(results['ids'][0]) if results['ids'] else 0)
         return results
     
-    def search_guides(self, query: str, n_results: int = 5) -> Dict[str, Any]:
+    def search_guides(self, query: str, n_results: int = 5,
+                      query_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """Search for relevant guide sections.
         
         Args:
             query: Search query
             n_results: Number of results to return
+            query_embedding: Precomputed embedding of the query (skips re-embedding)
             
         Returns:
             Search results with documents, metadata, and distances
         """
-        logger.debug(f"Searching guides for: {query[:100]}...")
+        logger.debug("Searching guides for: %.100s...", query)
         
-        query_embedding = self.generate_embeddings([query])[0]
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
         
         results = self.guides_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
+            # One (1, dim) array: chromadb 0.4.x rejects a list holding a 1-D array
+            query_embeddings=np.asarray(query_embedding, dtype=np.float32).reshape(1, -1),
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]  # Never ship embeddings back
         )
         
-        logger.debug(f"Found {len(results['ids'][0]) if results['ids'] else 0} guide results")
+        logger.debug("Found %d guide results", len(results['ids'][0]) if results['ids'] else 0)
         return results
     
-    def search_all(self, query: str, n_tickets: int = 3, n_guides: int = 3) -> Dict[str, Any]:
+    def search_all(self, query: str, n_tickets: int = 3, n_guides: int = 3,
+                   query_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """Search both tickets and guides.
         
         Args:
             query: Search query
             n_tickets: Number of ticket results
             n_guides: Number of guide results
+            query_embedding: Precomputed embedding of the query (skips re-embedding)
             
         Returns:
             Combined search results
         """
         logger.info(f"Searching all sources for: {query[:100]}...")
         
-        ticket_results = self.search_tickets(query, n_tickets)
-        guide_results = self.search_guides(query, n_guides)
+        # Embed the query once and reuse it for both collections
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        
+        # Query both collections concurrently (Chroma's HNSW search releases the GIL)
+        ticket_future = self._executor.submit(self.search_tickets, query, n_tickets,
+                                              query_embedding=query_embedding)
+        guide_results = self.search_guides(query, n_guides, query_embedding=query_embedding)
+        ticket_results = ticket_future.result()
         
         return {
             'query': query,
@@ -0,0 +1,43 @@
+"""JSON loading helpers."""
+import json
+from pathlib import Path
+from typing import Any, Iterator
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; fall back to the standard library
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Optional: stream large arrays instead of loading them whole
+    ijson = None
+
+
+def load_json(path: Path) -> Any:
+    """Load a JSON file, using orjson's SIMD parser when it is installed."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Below this size a whole-file orjson parse is fast and its memory cost is small;
+# above it, ijson's incremental parse keeps peak memory bounded.
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+
+def iter_json_array(path: Path, stream_threshold: int = STREAM_THRESHOLD_BYTES) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array.
+    
+    Files larger than stream_threshold bytes are parsed incrementally with
+    ijson (when installed), so only the items currently being processed are
+    held in memory; smaller files are loaded whole with load_json, which uses
+    orjson when available.
+    """
+    if ijson is not None and Path(path).stat().st_size > stream_threshold:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+    else:
+        yield from load_json(path)
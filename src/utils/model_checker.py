@@ -1,11 +1,33 @@
 """Utility to check available Ollama models."""
-import ollama
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Tuple
+from src.utils.ollama_client import get_ollama_client
+
+# Installed models change rarely; reuse the last listing for this many seconds
+_CACHE_TTL = 30.0
+_cache: Optional[Tuple[float, List[str]]] = None
+
+def invalidate():
+    """Drop the cached model list so the next call queries Ollama again."""
+    global _cache
+    _cache = None
 
 def get_available_models() -> List[str]:
-    """Get list of available Ollama models."""
+    """Get list of available Ollama models (cached for _CACHE_TTL seconds)."""
+    global _cache
+    if _cache is not None and time.monotonic() - _cache[0] < _CACHE_TTL:
+        return list(_cache[1])
+    
+    available = _fetch_available_models()
+    if available is not None:
+        _cache = (time.monotonic(), available)
+        return list(available)
+    return []
+
+def _fetch_available_models() -> Optional[List[str]]:
+    """Query Ollama for installed models (None if Ollama can't be reached)."""
     try:
-        result = ollama.list()
+        result = get_ollama_client().list()
         
         # Handle different response formats
         models = []
@@ -17,7 +39,7 @@ def get_available_models() -> List[str]:
         elif isinstance(result, list):
             models = result
         else:
-            return []
+            return None
         
         # Extract model names (filter out 'latest' aliases)
         available = []
@@ -41,27 +63,37 @@ def get_available_models() -> List[str]:
         return available
     except Exception as e:
         print(f"Error checking available models: {e}")
-        return []
+        return None  # Not cached, so a restarted Ollama is picked up immediately
+
+def _model_index(available: List[str]) -> Tuple[set, Dict[str, str]]:
+    """Build O(1) lookups: the set of names and base name -> first installed tag."""
+    prefix_map: Dict[str, str] = {}
+    for name in available:
+        prefix_map.setdefault(name.split(':', 1)[0], name)
+    return set(available), prefix_map
 
 def is_model_available(model_name: str) -> bool:
     """Check if a specific model is available."""
-    available = get_available_models()
-    return any(model_name in name or name == model_name for name in available)
+    name_set, prefix_map = _model_index(get_available_models())
+    if model_name in name_set:
+        return True
+    # An untagged name ('mistral') matches any installed tag; a tagged one must match exactly
+    return ':' not in model_name and model_name in prefix_map
 
 def find_best_available_model(preferred_models: List[str]) -> Optional[str]:
     """Find the best available model from a list of preferred models."""
     available = get_available_models()
+    name_set, prefix_map = _model_index(available)
     
     for preferred in preferred_models:
         # Check exact match first
-        if preferred in available:
+        if preferred in name_set:
             return preferred
         
-        # Check partial match (for variants)
-        for model in available:
-            if preferred.split(':')[0] in model or model.startswith(preferred.split(':')[0]):
-                return model
+        # Check base-name match (for variants, e.g. 'mistral' -> 'mistral:7b-instruct')
+        variant = prefix_map.get(preferred.split(':', 1)[0])
+        if variant:
+            return variant
     
     # Return first available model if none match
     return available[0] if available else None
-
@@ -0,0 +1,18 @@
+"""Shared Ollama client."""
+from functools import lru_cache
+from typing import Optional
+import ollama
+from config.settings import OLLAMA_BASE_URL
+
+
+@lru_cache(maxsize=None)
+def _client_for_host(host: str) -> ollama.Client:
+    return ollama.Client(host=host)
+
+
+def get_ollama_client(host: Optional[str] = None) -> ollama.Client:
+    """Get the process-wide Ollama client for a host (default from config).
+    
+    Clients are cached per host so every caller shares one HTTP connection pool.
+    """
+    return _client_for_host(host or OLLAMA_BASE_URL)
@@ -15,9 +15,7 @@ import streamlit.components.v1 as components
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from src.phase4.rag_pipeline import RAGPipeline
-from src.phase4.vector_db import VectorDBManager
-from src.utils.model_checker import get_available_models, is_model_available
+from src.utils.model_checker import get_available_models, invalidate as invalidate_model_list
 
 # Initialize copy state
 if 'copy_trigger' not in st.session_state:
@@ -156,21 +154,30 @@ if 'initialized' not in st.session_state:
     st.session_state.loading = False
     st.session_state.stats = None
 
-# Initialize RAG Pipeline (cached)
+# Vector database (cached once, shared by the pipelines of every model)
 @st.cache_resource
+def get_db_manager():
+    """Open the vector database once per server process."""
+    from src.phase4.vector_db import VectorDBManager
+    return VectorDBManager()
+
+# Initialize RAG Pipeline (cached per model; switching back to a model is free)
+@st.cache_resource
+def build_pipeline(model_name):
+    """Build the RAG pipeline for a model (exceptions are not cached)."""
+    # Imported here so chromadb/numpy load only when a pipeline is first built
+    from src.phase4.rag_pipeline import RAGPipeline
+    return RAGPipeline(db_manager=get_db_manager(), model=model_name)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_db_stats():
+    """Collection counts, reused for a minute across reruns and model switches."""
+    return get_db_manager().get_stats()
+
 def initialize_pipeline(model_name):
-    """Initialize the RAG pipeline (runs once per model)."""
+    """Initialize the RAG pipeline, returning (pipeline, error)."""
     try:
-        import os
-        # Force the model to be used
-        os.environ['OLLAMA_MODEL'] = model_name
-        
-        # Clear any cached imports
-        if 'config.settings' in sys.modules:
-            del sys.modules['config.settings']
-        
-        pipeline = RAGPipeline(model=model_name)
-        return pipeline, None
+        return build_pipeline(model_name), None
     except Exception as e:
         return None, str(e)
 
@@ -244,10 +251,6 @@ model_changed = st.session_state.current_model != selected_model
 # Load pipeline on first run or model change
 if not st.session_state.initialized or model_changed:
     with st.spinner(f"🚀 Initializing AI Assistant with {selected_model}..."):
-        # Clear cache if model changed
-        if model_changed and st.session_state.initialized:
-            st.cache_resource.clear()
-        
         pipeline, error = initialize_pipeline(selected_model)
         if error:
             st.error(f"❌ Failed to initialize model '{selected_model}': {error}")
@@ -255,6 +258,7 @@ if not st.session_state.initialized or model_changed:
                 st.warning(f"💡 Model '{selected_model}' is not installed. Pull it first:")
                 st.code(f"ollama pull {selected_model}", language="bash")
                 st.info("After pulling, refresh this page.")
+                invalidate_model_list()  # So the refresh sees the newly pulled model
             st.stop()
         else:
             st.session_state.pipeline = pipeline
@@ -263,7 +267,7 @@ if not st.session_state.initialized or model_changed:
             
             # Get initial stats
             try:
-                st.session_state.stats = pipeline.db_manager.get_stats()
+                st.session_state.stats = get_db_stats()
             except:
                 st.session_state.stats = {'tickets': 0, 'guides': 0}
 
@@ -351,9 +355,8 @@ with st.sidebar:
     
     # Clear cache
     if st.button("🔄 Clear Cache"):
-        if hasattr(st.session_state.pipeline, '_cache'):
-            cache_size = len(st.session_state.pipeline._cache)
-            st.session_state.pipeline._cache.clear()
+        if hasattr(st.session_state.pipeline, 'clear_cache'):
+            cache_size = st.session_state.pipeline.clear_cache()
             st.success(f"✓ Cleared {cache_size} cached responses")
             st.rerun()
     
@@ -375,8 +378,8 @@ with st.sidebar:
     st.caption("✅ Italian-optimized prompt")
     st.caption("✅ Smart caching enabled")
     st.caption("✅ qwen2.5:7b-instruct")
-    if hasattr(st.session_state.pipeline, '_cache'):
-        cache_size = len(st.session_state.pipeline._cache)
+    if hasattr(st.session_state.pipeline, 'cache_size'):
+        cache_size = st.session_state.pipeline.cache_size()
         st.caption(f"📦 {cache_size} cached responses")
 
 # Main interface
@@ -459,12 +462,26 @@ if generate_btn and query.strip():
             start_time = time.time()
             
             # Actual query
-            result = st.session_state.pipeline.query(
-                query,
-                n_tickets=n_tickets,
-                n_guides=n_guides,
-                num_drafts=num_drafts
-            )
+            if num_drafts > 1:
+                result = st.session_state.pipeline.query(
+                    query,
+                    n_tickets=n_tickets,
+                    n_guides=n_guides,
+                    num_drafts=num_drafts
+                )
+            else:
+                # Single draft: stream tokens as they arrive
+                result = st.session_state.pipeline.query_stream(
+                    query,
+                    n_tickets=n_tickets,
+                    n_guides=n_guides
+                )
+                progress_bar.progress(75)
+                status_text.text("✍️ Writing response...")
+                stream_box = st.empty()
+                with stream_box.container():
+                    result['response'] = st.write_stream(result['response_stream'])
+                stream_box.empty()  # The formatted response below replaces the live text
             
             # Calculate elapsed time
             elapsed_time = time.time() - start_time
@@ -478,7 +495,7 @@ if generate_btn and query.strip():
             status_text.empty()
             
             # Determine if cached
-            was_cached = elapsed_time < 1.0  # If response was instant, it was cached
+            was_cached = result.get('cached', elapsed_time < 1.0)  # Multi-draft: instant means cached
             
             # Store results with timing
             st.session_state.current_response = result['response']
@@ -0,0 +1,98 @@
+"""Tests for the Ollama model checker utilities."""
+import pytest
+from unittest.mock import patch
+from src.utils import model_checker
+from src.utils.model_checker import get_available_models, invalidate, is_model_available, find_best_available_model
+
+
+@pytest.fixture
+def installed_models():
+    """Patch the installed model list."""
+    with patch('src.utils.model_checker.get_available_models') as mock:
+        mock.return_value = ['gemma2:2b', 'mistral:7b-instruct']
+        yield mock
+
+
+class TestModelLookup:
+    """Test model availability lookups."""
+    
+    def test_exact_name_available(self, installed_models):
+        """Test that an installed name:tag is available."""
+        assert is_model_available('gemma2:2b') is True
+    
+    def test_untagged_name_matches_any_tag(self, installed_models):
+        """Test that a bare model name matches an installed tag."""
+        assert is_model_available('mistral') is True
+    
+    def test_wrong_tag_not_available(self, installed_models):
+        """Test that a different tag of an installed model is not available."""
+        assert is_model_available('gemma2:9b') is False
+        assert is_model_available('qwen2.5') is False
+    
+    def test_find_best_available_model(self, installed_models):
+        """Test preferred-model resolution order."""
+        assert find_best_available_model(['llama3.1:8b', 'mistral:7b-instruct']) == 'mistral:7b-instruct'
+        assert find_best_available_model(['mistral:7b']) == 'mistral:7b-instruct'
+        assert find_best_available_model(['llama3.1:8b']) == 'gemma2:2b'
+
+
+@pytest.fixture
+def ollama_list():
+    """Patch the Ollama client's list() call and start from an empty cache."""
+    invalidate()
+    with patch('src.utils.model_checker.get_ollama_client') as mock:
+        mock.return_value.list.return_value = {'models': [{'name': 'gemma2:2b'}]}
+        yield mock.return_value.list
+    invalidate()
+
+
+@pytest.fixture
+def clock():
+    """Controllable time.monotonic() for the model list cache."""
+    now = [1000.0]
+    with patch('src.utils.model_checker.time.monotonic', side_effect=lambda: now[0]):
+        yield now
+
+
+class TestModelListCache:
+    """Test the TTL cache around get_available_models."""
+    
+    def test_hit_within_ttl(self, ollama_list, clock):
+        """Test that a second call within the TTL reuses the cached list."""
+        assert get_available_models() == ['gemma2:2b']
+        clock[0] += model_checker._CACHE_TTL - 1
+        assert get_available_models() == ['gemma2:2b']
+        
+        ollama_list.assert_called_once()
+    
+    def test_refetch_after_ttl(self, ollama_list, clock):
+        """Test that the list is fetched again once the TTL has passed."""
+        get_available_models()
+        ollama_list.return_value = {'models': [{'name': 'gemma2:2b'}, {'name': 'mistral:7b'}]}
+        clock[0] += model_checker._CACHE_TTL + 1
+        
+        assert get_available_models() == ['gemma2:2b', 'mistral:7b']
+        assert ollama_list.call_count == 2
+    
+    def test_failure_not_cached(self, ollama_list, clock):
+        """Test that a failed lookup is retried on the next call."""
+        ollama_list.side_effect = ConnectionError("Ollama not running")
+        assert get_available_models() == []
+        
+        ollama_list.side_effect = None
+        assert get_available_models() == ['gemma2:2b']
+        assert ollama_list.call_count == 2
+    
+    def test_invalidate_forces_refetch(self, ollama_list, clock):
+        """Test that invalidate() drops the cached list within the TTL."""
+        get_available_models()
+        invalidate()
+        get_available_models()
+        
+        assert ollama_list.call_count == 2
+    
+    def test_returns_copy(self, ollama_list, clock):
+        """Test that callers can't mutate the cached list."""
+        get_available_models().append('mutated')
+        
+        assert get_available_models() == ['gemma2:2b']
@@ -1,5 +1,8 @@
 """Tests for Phase 4: RAG Pipeline."""
+import json
+import numpy as np
 import pytest
+from datetime import timedelta
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 from src.phase4.vector_db import VectorDBManager
@@ -9,9 +12,10 @@ from src.phase4.rag_pipeline import RAGPipeline
 @pytest.fixture
 def mock_embedding_model():
     """Mock SentenceTransformer model."""
-    with patch('src.phase4.vector_db.SentenceTransformer') as mock:
+    with patch('src.phase4.vector_db._load_embedding_model') as mock:
         model_instance = Mock()
         model_instance.get_sentence_embedding_dimension.return_value = 384
+        model_instance.max_seq_length = 384
         model_instance.encode.return_value = [[0.1] * 384]  # Mock embedding
         mock.return_value = model_instance
         yield mock
@@ -52,6 +56,17 @@ class TestVectorDBManager:
         assert db.embedding_dim == 384
         mock_embedding_model.assert_called_once()
     
+    def test_embedding_model_loaded_lazily(self, mock_chroma_client, mock_embedding_model, tmp_path):
+        """Test that the embedding model is not loaded until first needed."""
+        db = VectorDBManager(db_path=tmp_path / "test_db")
+        db.create_collections()
+        db.get_stats()
+        
+        mock_embedding_model.assert_not_called()
+        
+        db.generate_embeddings(["test text"])
+        mock_embedding_model.assert_called_once()
+    
     def test_create_collections(self, mock_chroma_client, mock_embedding_model, tmp_path):
         """Test collection creation."""
         db = VectorDBManager(db_path=tmp_path / "test_db")
@@ -67,9 +82,58 @@ class TestVectorDBManager:
         
         embeddings = db.generate_embeddings(texts)
         
-        assert isinstance(embeddings, list)
+        assert isinstance(embeddings, np.ndarray)
+        assert embeddings.dtype == np.float32
         assert len(embeddings) > 0
     
+    def test_generate_embeddings_dedupes_texts(self, mock_chroma_client, mock_embedding_model, tmp_path):
+        """Test that duplicate texts are embedded once and scattered back in order."""
+        db = VectorDBManager(db_path=tmp_path / "test_db")
+        db.embedding_model.encode.side_effect = lambda texts, **kwargs: [[float(len(t))] * 384 for t in texts]
+        
+        embeddings = db.generate_embeddings(["a", "bb", "a"])
+        
+        assert db.embedding_model.encode.call_args.args[0] == ["a", "bb"]
+        assert embeddings.shape == (3, 384)
+        assert [row[0] for row in embeddings] == [1.0, 2.0, 1.0]
+    
+    def test_add_tickets_in_batches(self, mock_chroma_client, mock_embedding_model, tmp_path):
+        """Test that tickets are embedded and added in batch_size chunks."""
+        tickets = [
+            {'ticket_id': i, 'searchable_text': f'ticket text {i}', 'subject': f'Subject {i}'}
+            for i in range(5)
+        ]
+        tickets.append({'ticket_id': 99, 'searchable_text': ''})  # Skipped: no text
+        tickets_file = tmp_path / "tickets.json"
+        tickets_file.write_text(json.dumps(tickets), encoding='utf-8')
+        
+        db = VectorDBManager(db_path=tmp_path / "test_db")
+        db.embedding_model.encode.side_effect = lambda texts, **kwargs: [[0.1] * 384 for _ in texts]
+        db.create_collections()
+        db.add_tickets(tickets_file, batch_size=2)
+        
+        add_calls = db.tickets_collection.upsert.call_args_list
+        assert [len(call.kwargs['ids']) for call in add_calls] == [2, 2, 1]
+        assert add_calls[0].kwargs['ids'] == ['ticket_0', 'ticket_1']
+    
+    def test_add_tickets_embeds_repeated_text_once(self, mock_chroma_client, mock_embedding_model, tmp_path):
+        """Test that documents repeated across batches are only embedded once."""
+        tickets = [
+            {'ticket_id': i, 'searchable_text': 'Thanks, we will get back to you soon'}
+            for i in range(4)
+        ]
+        tickets_file = tmp_path / "tickets.json"
+        tickets_file.write_text(json.dumps(tickets), encoding='utf-8')
+        
+        db = VectorDBManager(db_path=tmp_path / "test_db")
+        db.embedding_model.encode.side_effect = lambda texts, **kwargs: [[0.1] * 384 for _ in texts]
+        db.create_collections()
+        db.add_tickets(tickets_file, batch_size=2)
+        
+        db.embedding_model.encode.assert_called_once()
+        upsert_calls = db.tickets_collection.upsert.call_args_list
+        assert [len(call.kwargs['embeddings']) for call in upsert_calls] == [2, 2]
+    
     def test_search_tickets(self, mock_chroma_client, mock_embedding_model, tmp_path):
         """Test ticket search."""
         db = VectorDBManager(db_path=tmp_path / "test_db")
@@ -81,6 +145,29 @@ class TestVectorDBManager:
         assert 'documents' in results
         assert 'metadatas' in results
     
+    def test_search_passes_2d_query_embedding(self, mock_chroma_client, mock_embedding_model, tmp_path):
+        """Test that searches send Chroma a (1, dim) array, not a list of 1-D arrays."""
+        db = VectorDBManager(db_path=tmp_path / "test_db")
+        db.create_collections()
+        
+        db.search_tickets("test query", n_results=3)
+        db.search_guides("test query", n_results=3)
+        
+        for call in db.tickets_collection.query.call_args_list:
+            query_embeddings = call.kwargs['query_embeddings']
+            assert isinstance(query_embeddings, np.ndarray)
+            assert query_embeddings.shape == (1, 384)
+    
+    def test_embed_query_cached(self, mock_chroma_client, mock_embedding_model, tmp_path):
+        """Test that repeated queries reuse the cached embedding."""
+        db = VectorDBManager(db_path=tmp_path / "test_db")
+        db.create_collections()
+        
+        db.search_tickets("test  query", n_results=3)
+        db.search_guides("test query", n_results=3)
+        
+        db.embedding_model.encode.assert_called_once()
+    
     def test_search_guides(self, mock_chroma_client, mock_embedding_model, tmp_path):
         """Test guide search."""
         db = VectorDBManager(db_path=tmp_path / "test_db")
@@ -153,9 +240,10 @@ class TestRAGPipeline:
         assert context in prompt
         assert 'LaCuraDellAuto' in prompt
     
-    @patch('src.phase4.rag_pipeline.ollama.generate')
-    def test_generate_response(self, mock_ollama, mock_chroma_client, mock_embedding_model, tmp_path):
+    @patch('src.phase4.rag_pipeline.get_ollama_client')
+    def test_generate_response(self, mock_client, mock_chroma_client, mock_embedding_model, tmp_path):
         """Test response generation."""
+        mock_ollama = mock_client.return_value.generate
         mock_ollama.return_value = {'response': 'Generated response'}
         
         db_manager = VectorDBManager(db_path=tmp_path / "test_db")
@@ -166,9 +254,10 @@ class TestRAGPipeline:
         assert response == 'Generated response'
         mock_ollama.assert_called_once()
     
-    @patch('src.phase4.rag_pipeline.ollama.list')
-    def test_check_ollama_status(self, mock_list, mock_chroma_client, mock_embedding_model, tmp_path):
+    @patch('src.phase4.rag_pipeline.get_ollama_client')
+    def test_check_ollama_status(self, mock_client, mock_chroma_client, mock_embedding_model, tmp_path):
         """Test Ollama status check."""
+        mock_list = mock_client.return_value.list
         mock_list.return_value = {'models': [{'name': 'mistral:latest'}]}
         
         db_manager = VectorDBManager(db_path=tmp_path / "test_db")
@@ -179,3 +268,180 @@ class TestRAGPipeline:
         assert status['ollama_running'] is True
         assert 'available_models' in status
 
+
+def _unit(*values):
+    """Unit-length float32 vector."""
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def pipeline(mock_chroma_client, mock_embedding_model, tmp_path):
+    """RAG pipeline over mocked ChromaDB and embedding model."""
+    return RAGPipeline(db_manager=VectorDBManager(db_path=tmp_path / "test_db"))
+
+
+class TestSemanticCache:
+    """Test the semantic (near-duplicate query) response cache."""
+    
+    def test_hit_above_threshold(self, pipeline):
+        """Test that a near-identical query vector returns the cached response."""
+        response = {'response': 'cached answer'}
+        pipeline._cache_semantic_response(_unit(1, 0, 0), 3, 3, response)
+        
+        assert pipeline._get_semantic_cached_response(_unit(1, 0.1, 0), 3, 3) is response
+    
+    def test_miss_below_threshold(self, pipeline):
+        """Test that a dissimilar query vector misses."""
+        pipeline._cache_semantic_response(_unit(1, 0, 0), 3, 3, {'response': 'cached answer'})
+        
+        assert pipeline._get_semantic_cached_response(_unit(1, 0.6, 0), 3, 3) is None
+    
+    def test_miss_on_different_result_counts(self, pipeline):
+        """Test that n_tickets/n_guides must match the cached entry."""
+        pipeline._cache_semantic_response(_unit(1, 0, 0), 3, 3, {'response': 'cached answer'})
+        
+        assert pipeline._get_semantic_cached_response(_unit(1, 0, 0), 5, 3) is None
+        assert pipeline._get_semantic_cached_response(_unit(1, 0, 0), 3, 1) is None
+    
+    def test_expired_entry_misses(self, pipeline):
+        """Test that entries older than the TTL are not served."""
+        pipeline._cache_semantic_response(_unit(1, 0, 0), 3, 3, {'response': 'cached answer'})
+        pipeline._semantic_cache[0]['timestamp'] -= timedelta(hours=25)
+        
+        assert pipeline._get_semantic_cached_response(_unit(1, 0, 0), 3, 3) is None
+    
+    def test_evicts_oldest_entry(self, pipeline):
+        """Test that the oldest entry is evicted and vectors stay aligned with entries."""
+        pipeline._semantic_cache_size = 2
+        first, second, third = {'response': '1'}, {'response': '2'}, {'response': '3'}
+        pipeline._cache_semantic_response(_unit(1, 0, 0), 3, 3, first)
+        pipeline._cache_semantic_response(_unit(0, 1, 0), 3, 3, second)
+        pipeline._cache_semantic_response(_unit(0, 0, 1), 3, 3, third)
+        
+        assert pipeline._get_semantic_cached_response(_unit(1, 0, 0), 3, 3) is None
+        assert pipeline._get_semantic_cached_response(_unit(0, 1, 0), 3, 3) is second
+        assert pipeline._get_semantic_cached_response(_unit(0, 0, 1), 3, 3) is third
+    
+    def test_hit_refreshes_entry(self, pipeline):
+        """Test that a cache hit protects the entry from the next eviction (LRU)."""
+        pipeline._semantic_cache_size = 2
+        first, second, third = {'response': '1'}, {'response': '2'}, {'response': '3'}
+        pipeline._cache_semantic_response(_unit(1, 0, 0), 3, 3, first)
+        pipeline._cache_semantic_response(_unit(0, 1, 0), 3, 3, second)
+        assert pipeline._get_semantic_cached_response(_unit(1, 0, 0), 3, 3) is first
+        pipeline._cache_semantic_response(_unit(0, 0, 1), 3, 3, third)
+        
+        assert pipeline._get_semantic_cached_response(_unit(1, 0, 0), 3, 3) is first
+        assert pipeline._get_semantic_cached_response(_unit(0, 1, 0), 3, 3) is None
+        assert pipeline._get_semantic_cached_response(_unit(0, 0, 1), 3, 3) is third
+    
+    def test_expired_entries_evicted_first(self, pipeline):
+        """Test that expired entries are dropped before live ones when full."""
+        pipeline._semantic_cache_size = 2
+        first, second, third = {'response': '1'}, {'response': '2'}, {'response': '3'}
+        pipeline._cache_semantic_response(_unit(1, 0, 0), 3, 3, first)
+        pipeline._cache_semantic_response(_unit(0, 1, 0), 3, 3, second)
+        pipeline._semantic_cache[1]['timestamp'] -= timedelta(hours=25)
+        pipeline._cache_semantic_response(_unit(0, 0, 1), 3, 3, third)
+        
+        assert [entry['response'] for entry in pipeline._semantic_cache] == [first, third]
+        assert pipeline._get_semantic_cached_response(_unit(1, 0, 0), 3, 3) is first
+        assert pipeline._get_semantic_cached_response(_unit(0, 0, 1), 3, 3) is third
+    
+    def test_clear_cache(self, pipeline):
+        """Test that clear_cache empties both caches and counts each response once."""
+        response = {'response': 'cached answer'}
+        pipeline._cache_response('key', response)
+        pipeline._cache_semantic_response(_unit(1, 0, 0), 3, 3, response)
+        
+        assert pipeline.cache_size() == 1
+        assert pipeline.clear_cache() == 1
+        assert pipeline.cache_size() == 0
+        assert pipeline._get_semantic_cached_response(_unit(1, 0, 0), 3, 3) is None
+    
+    def test_multi_draft_query_skips_cache(self, pipeline):
+        """Test that a cached 1-draft result is not returned for a num_drafts=3 call."""
+        with patch.object(pipeline.client, 'generate', return_value={'response': 'single draft'}):
+            pipeline.query("How do I wash my car?")
+            result = pipeline.query("How do I wash my car?", num_drafts=3)
+        
+        assert result['num_drafts'] == 3
+        assert len(result['responses']) == 3
+    
+    def test_generation_errors_not_cached(self, pipeline):
+        """Test that an Ollama failure is not cached for later queries."""
+        with patch.object(pipeline.client, 'generate', side_effect=ConnectionError("refused")):
+            result = pipeline.query("How do I wash my car?")
+        
+        assert result['response'].startswith("Error:")
+        assert pipeline.cache_size() == 0
+
+
+def _stream(*texts, error=None):
+    """Fake Ollama streaming response, optionally failing after the given chunks."""
+    for text in texts:
+        yield {'response': text}
+    if error is not None:
+        raise error
+
+
+class TestStreaming:
+    """Test streaming generation."""
+    
+    def test_stream_response_yields_chunks_in_order(self, pipeline):
+        """Test that chunks are yielded in order and empty chunks are skipped."""
+        with patch.object(pipeline.client, 'generate', return_value=_stream('Ciao', '', ' mondo', '!')) as mock_generate:
+            chunks = list(pipeline.stream_response("test prompt"))
+        
+        assert chunks == ['Ciao', ' mondo', '!']
+        assert mock_generate.call_args.kwargs['stream'] is True
+    
+    def test_generate_response_stream_joins_chunks(self, pipeline):
+        """Test that generate_response(stream=True) returns the joined text."""
+        with patch.object(pipeline.client, 'generate', return_value=_stream('Ciao', '', ' mondo')):
+            response = pipeline.generate_response("test prompt", stream=True)
+        
+        assert response == 'Ciao mondo'
+    
+    def test_stream_error_mid_stream(self, pipeline):
+        """Test that a failure mid-stream yields the error string after earlier chunks."""
+        stream = _stream('Ciao', error=ConnectionError("connection reset"))
+        with patch.object(pipeline.client, 'generate', return_value=stream):
+            chunks = list(pipeline.stream_response("test prompt"))
+        
+        assert chunks[0] == 'Ciao'
+        assert chunks[1].startswith("Error: Unable to generate response.")
+        assert 'connection reset' in chunks[1]
+    
+    def test_query_stream(self, pipeline):
+        """Test that query_stream returns context plus a lazy response stream."""
+        with patch.object(pipeline.client, 'generate', return_value=_stream('Ciao', ' mondo')):
+            result = pipeline.query_stream("How do I wash my car?")
+            
+            assert 'tickets' in result['context']
+            assert 'guides' in result['context']
+            assert ''.join(result['response_stream']) == 'Ciao mondo'
+    
+    def test_query_stream_caches_consumed_response(self, pipeline):
+        """Test that a fully streamed response is served from cache the second time."""
+        with patch.object(pipeline.client, 'generate', side_effect=lambda **kwargs: _stream('Ciao', ' mondo')) as mock_generate:
+            first = pipeline.query_stream("How do I wash my car?")
+            assert ''.join(first['response_stream']) == 'Ciao mondo'
+            assert first['response'] == 'Ciao mondo'
+            
+            second = pipeline.query_stream("How do I wash my car?")
+            assert second['cached'] is True
+            assert ''.join(second['response_stream']) == 'Ciao mondo'
+        
+        assert mock_generate.call_count == 1
+        assert pipeline.query("How do I wash my car?")['response'] == 'Ciao mondo'
+    
+    def test_query_stream_errors_not_cached(self, pipeline):
+        """Test that a stream ending in an error is not cached."""
+        stream = _stream('Ciao', error=ConnectionError("connection reset"))
+        with patch.object(pipeline.client, 'generate', return_value=stream):
+            result = pipeline.query_stream("How do I wash my car?")
+            list(result['response_stream'])
+        
+        assert pipeline.cache_size() == 0